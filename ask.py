@@ -5,8 +5,10 @@ from transformers import AutoModel, AutoTokenizer
 from openai import OpenAI
 
 from src.inference.ask_service import AskService
-from src.shared.embeddings import EmbeddingsService
+from src.inference.answer_cache import build_answer_cache
+from src.shared.embeddings import build_embeddings_service
 from src.shared.qdrant_repository import QdrantRepository
+from src.shared.shard_router import ShardRouter
 from src.inference.search import SearchTool
 from src.inference.reranker import Reranker
 from src.shared.environment import Environment
@@ -51,21 +53,38 @@ def main():
     tokenizer = AutoTokenizer.from_pretrained(environment.EMBEDDINGS_TOKENIZER)
     
     reranker = Reranker(model_name=environment.RERANKER_MODEL)
-    embeddings_service = EmbeddingsService(model, tokenizer)
+    embeddings_service = build_embeddings_service(
+        environment.EMBEDDINGS_BACKEND, model, tokenizer,
+        model_name=environment.EMBEDDINGS_MODEL,
+        max_length=environment.EMBEDDINGS_MAX_LENGTH,
+        num_threads=environment.EMBEDDINGS_THREADS,
+        onnx_dir=environment.EMBEDDINGS_ONNX_DIR,
+        parity_texts=[item["query"] for item in data],
+        parity_tolerance=environment.EMBEDDINGS_PARITY_TOLERANCE,
+    )
+    # Liberar el modelo de referencia si el backend no lo usa
+    del model
     qdrant_repository = QdrantRepository(environment.QDRANT_URL)
     openai_client = OpenAI(api_key=environment.OPENAI_API_KEY)
+    shard_router = ShardRouter(environment.QDRANT_COLLECTION, environment.QDRANT_SHARDS)
     
     # Configurar herramienta de búsqueda (con o sin reranking)
     rerank = environment.RERANK
     if rerank:
         print("Configurando búsqueda con reranking...")
-        search_tool = SearchTool(qdrant_repository, embeddings_service, reranker)
+        search_tool = SearchTool(qdrant_repository, embeddings_service, reranker, shard_router=shard_router)
     else:
         print("Configurando búsqueda sin reranking...")
-        search_tool = SearchTool(qdrant_repository, embeddings_service)
+        search_tool = SearchTool(qdrant_repository, embeddings_service, shard_router=shard_router)
     
-    # Inicializar servicio de consultas
-    ask_service = AskService(openai_client, system_prompt, tools, search_tool)
+    # Inicializar caché de respuestas y servicio de consultas
+    answer_cache = build_answer_cache(
+        environment.ANSWER_CACHE, environment.ANSWER_CACHE_PATH, environment.ANSWER_CACHE_SIZE
+    )
+    ask_service = AskService(
+        openai_client, system_prompt, tools, search_tool,
+        model=environment.OPENAI_MODEL, answer_cache=answer_cache
+    )
     
     # Procesar consultas
     print("Procesando consultas...")
@@ -89,6 +108,14 @@ def main():
     print(f"¡Proceso completado! Se procesaron {len(results)} consultas.")
     print(f"Resultados guardados en '{output_filename}'")
 
+    if answer_cache is not None:
+        stats = answer_cache.stats()
+        print(
+            f"Caché de respuestas: {stats['hits']} aciertos, {stats['misses']} fallos "
+            f"({stats['invalidations']} por evidencia cambiada, hit rate {stats['hit_rate']:.2%}), "
+            f"{stats['saved_seconds']:.1f}s de latencia ahorrados"
+        )
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,26 @@
+from src.shared.qdrant_repository import QdrantRepository
+from src.shared.shard_router import ShardRouter
+from src.shared.environment import Environment
+
+
+def main():
+    """
+    Migración puntual: crea el índice de payload sobre `document` en las colecciones
+    existentes (la colección base y sus shards), necesario para filtrar por
+    documento sin recorrer toda la colección. Las colecciones nuevas lo reciben
+    durante la ingesta. Es idempotente.
+    """
+    environment = Environment()
+    qdrant_repository = QdrantRepository(environment.QDRANT_URL)
+    shard_router = ShardRouter(environment.QDRANT_COLLECTION, environment.QDRANT_SHARDS)
+
+    for collection in shard_router.collections_for():
+        if not qdrant_repository.collection_exists(collection):
+            print(f"Omitiendo {collection}: la colección no existe")
+            continue
+        qdrant_repository.ensure_document_index(collection)
+        print(f"Índice sobre 'document' creado en {collection}")
+
+
+if __name__ == "__main__":
+    main()
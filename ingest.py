@@ -9,6 +9,7 @@ from src.ingest.chunker import Chunker
 from src.shared.embeddings import EmbeddingsService
 from src.models import Chunk
 from src.shared.qdrant_repository import QdrantRepository
+from src.shared.shard_router import ShardRouter
 from src.shared.environment import Environment
 
 
@@ -33,6 +34,7 @@ def main():
     tokenizer = AutoTokenizer.from_pretrained(environment.EMBEDDINGS_TOKENIZER)
     embeddings_service = EmbeddingsService(model, tokenizer)
     qdrant_repository = QdrantRepository(environment.QDRANT_URL)
+    shard_router = ShardRouter(environment.QDRANT_COLLECTION, environment.QDRANT_SHARDS)
     
     # Descargar PDFs
     print("Descargando PDFs...")
@@ -67,7 +69,7 @@ def main():
     for chunk in tqdm(all_chunks, desc="Procesando chunks"):
         embedding = embeddings_service.get_embeddings(chunk.text)
         chunk.embedding = embedding
-        qdrant_repository.upsert(environment.QDRANT_COLLECTION, chunk)
+        qdrant_repository.upsert(shard_router.collection_for(chunk), chunk)
     
     print("¡Proceso de ingesta completado exitosamente!")
 
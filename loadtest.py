@@ -0,0 +1,123 @@
+import argparse
+import json
+import tempfile
+from contextlib import nullcontext
+
+from src.inference.ask_service import AskService
+from src.inference.answer_cache import SqliteAnswerCache, build_answer_cache
+from src.inference.search import SearchTool
+from src.loadtest.load_generator import LoadGenerator, StageRecorder
+from src.loadtest.stand_ins import (
+    InMemoryQdrantRepository,
+    LocalEmbeddingsService,
+    LocalOpenAIClient,
+    LocalReranker,
+)
+from src.shared.shard_router import ShardRouter
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prueba de carga del pipeline de inferencia con sustitutos locales.")
+    parser.add_argument("--requests-file", default="eval.jsonl", help="Fichero JSONL con un campo 'query' por línea")
+    parser.add_argument("--repeat", type=int, default=10, help="Veces que se reproduce el fichero")
+    parser.add_argument("--target", choices=["ask", "search"], default="ask", help="AskService completo o solo SearchTool")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones en vuelo como máximo")
+    parser.add_argument("--qps", type=float, default=None, help="QPS objetivo (bucle abierto). Sin él, bucle cerrado")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--embeddings-latency-ms", type=float, default=20.0)
+    parser.add_argument("--rerank-latency-ms", type=float, default=None, help="Activa el reranker sustituto con esta latencia")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variación uniforme aplicada a todas las latencias")
+    parser.add_argument("--chunks-per-document", type=int, default=50)
+    parser.add_argument("--rewrite-queries", action="store_true",
+                        help="El LLM sustituto reformula la query antes de buscar, como en producción")
+    parser.add_argument("--answer-cache", default="none", help="none, memory o sqlite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Guarda el informe en JSON")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Función principal para la prueba de carga.
+
+    Este proceso:
+    1. Carga las queries del fichero de peticiones
+    2. Construye el pipeline con un LLM, embeddings, reranker y Qdrant locales
+    3. Reproduce las queries a una concurrencia o QPS objetivo
+    4. Muestra percentiles de latencia, throughput, retraso en cola y desglose por etapa
+    """
+    args = parse_args()
+
+    print("Cargando peticiones...")
+    data = []
+    with open(args.requests_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                data.append(json.loads(line))
+    queries = [item["query"] for item in data] * args.repeat
+    document_names = sorted({item["document"] for item in data if "document" in item}) or ["document"]
+
+    print("Inicializando sustitutos locales...")
+    collection = "rag-pipeline"
+    embeddings_service = LocalEmbeddingsService(latency_ms=args.embeddings_latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    qdrant_repository = InMemoryQdrantRepository()
+    seed_embeddings = LocalEmbeddingsService()
+    n_chunks = qdrant_repository.seed(collection, seed_embeddings, document_names, args.chunks_per_document)
+    print(f"Ingestados {n_chunks} chunks sintéticos en Qdrant en memoria")
+
+    reranker = None
+    if args.rerank_latency_ms is not None:
+        reranker = LocalReranker(latency_ms=args.rerank_latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+    openai_client = LocalOpenAIClient(
+        latency_ms=args.llm_latency_ms, jitter_ms=args.jitter_ms, seed=args.seed, rewrite_queries=args.rewrite_queries
+    )
+
+    search_tool = SearchTool(qdrant_repository, embeddings_service, reranker, shard_router=ShardRouter(collection))
+    with open("prompts/tools.json", "r") as f:
+        tools = json.load(f)
+    with open("prompts/system_prompt.txt", "r") as f:
+        system_prompt = f.read()
+
+    # Instrumentar las etapas del pipeline
+    recorder = StageRecorder()
+    recorder.wrap(embeddings_service, "get_embeddings", "embeddings")
+    recorder.wrap(search_tool, "retrieve", "retrieval")
+    if reranker is not None:
+        recorder.wrap(reranker, "rerank", "rerank")
+    recorder.wrap(openai_client.responses, "create", "llm")
+
+    # Cada ejecución parte de una caché vacía para no falsear las métricas; la caché
+    # SQLite vive en un directorio temporal que se elimina al terminar
+    use_sqlite = args.answer_cache.lower() == "sqlite"
+    with tempfile.TemporaryDirectory(prefix="loadtest-") if use_sqlite else nullcontext() as cache_dir:
+        cache_path = f"{cache_dir}/answers.sqlite" if cache_dir else ""
+        answer_cache = build_answer_cache(args.answer_cache, cache_path, 1024)
+        try:
+            ask_service = AskService(openai_client, system_prompt, tools, search_tool, answer_cache=answer_cache)
+            target = ask_service.ask if args.target == "ask" else search_tool.search
+            mode = f"{args.qps} QPS" if args.qps else f"concurrencia {args.concurrency}"
+            print(f"Lanzando {len(queries)} peticiones contra {args.target} ({mode})...")
+            generator = LoadGenerator(target, recorder, concurrency=args.concurrency, qps=args.qps)
+            report = generator.run(queries)
+            if answer_cache is not None:
+                report["answer_cache"] = answer_cache.stats()
+        finally:
+            if isinstance(answer_cache, SqliteAnswerCache):
+                answer_cache.close()
+
+    print(f"Peticiones: {report['requests']} ({report['errors']} errores) en {report['elapsed_s']:.2f}s")
+    print(f"Throughput: {report['throughput_rps']:.2f} req/s")
+    print(f"{'':<16}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = [("latencia", report["latency_ms"]), ("cola", report["queue_delay_ms"])]
+    rows += list(report["stages_ms"].items())
+    for name, values in rows:
+        print(f"{name:<16}" + "".join(f"{values[key]:>10.1f}" for key in ("mean", "p50", "p95", "p99")))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Informe guardado en '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from src.models import RAGResponse
+
+
+class AnswerCache(ABC):
+    """
+    Caché de respuestas de AskService.
+
+    Las entradas se buscan por la query normalizada, el hash del prompt de sistema,
+    el modelo y el ámbito de búsqueda. Cada entrada guarda, por cada búsqueda que
+    hizo el LLM, los IDs de los chunks candidatos recuperados; al acertar, quien
+    llama vuelve a recuperarlos y la entrada se descarta si la evidencia ha
+    cambiado. Las subclases tienen que implementar `_get`, `_set` y `_delete`.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normaliza la query: unicode, mayúsculas, signos de puntuación y espacios."""
+        query = unicodedata.normalize("NFKC", query).casefold()
+        query = re.sub(r"[¿?¡!.,;:\"'`()\[\]]", " ", query)
+        return " ".join(query.split())
+
+    def build_key(self, query: str, system_prompt: str, model: str, document_names: list[str] | None = None,
+                  shards: list[str] | None = None) -> str:
+        payload = {
+            "query": self.normalize_query(query),
+            "system_prompt": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            "model": model,
+            "document_names": sorted(document_names) if document_names is not None else None,
+            "shards": sorted(shards) if shards is not None else None,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, is_valid: Callable[[dict[str, list[str]]], bool] | None = None) -> RAGResponse | None:
+        """
+        Devuelve la respuesta cacheada, o None si no existe o su evidencia ya no es válida.
+
+        Args:
+            is_valid: Recibe la evidencia guardada ({search_query: [chunk_id, ...]}) y
+                devuelve si sigue siendo la que se recupera actualmente. Si devuelve
+                False, la entrada se elimina y cuenta como fallo.
+        """
+        entry = self._get(key)
+        if entry is not None:
+            data = json.loads(entry[0])
+            if is_valid is not None and not is_valid(data["evidence"]):
+                self._delete(key)
+                with self._stats_lock:
+                    self.invalidations += 1
+                entry = None
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry[1]
+        return RAGResponse.model_validate(data["response"])
+
+    def set(self, key: str, response: RAGResponse, evidence: dict[str, list[str]], latency: float) -> None:
+        """
+        Guarda una respuesta junto con su evidencia y la latencia que costó generarla,
+        que se contabiliza como tiempo ahorrado en cada acierto posterior.
+        """
+        value = json.dumps({
+            "response": response.model_dump(mode="json"),
+            "evidence": {search_query: sorted(chunk_ids) for search_query, chunk_ids in evidence.items()},
+        }, ensure_ascii=False)
+        self._set(key, value, latency)
+
+    def stats(self) -> dict[str, float]:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    @abstractmethod
+    def _get(self, key: str) -> tuple[str, float] | None:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, value: str, latency: float) -> None:
+        ...
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        ...
+
+
+class InMemoryAnswerCache(AnswerCache):
+    """Caché LRU en memoria."""
+
+    def __init__(self, max_size: int = 1024):
+        super().__init__()
+        if max_size <= 0:
+            raise ValueError("max_size debe ser > 0.")
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> tuple[str, float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _set(self, key: str, value: str, latency: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SqliteAnswerCache(AnswerCache):
+    """Caché LRU persistente en disco sobre SQLite."""
+
+    def __init__(self, path: str, max_size: int = 1024):
+        super().__init__()
+        if max_size <= 0:
+            raise ValueError("max_size debe ser > 0.")
+        self.max_size = max_size
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, latency REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS answers_accessed ON answers (accessed)")
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> tuple[str, float] | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, latency FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE answers SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+        return row[0], row[1]
+
+    def _set(self, key: str, value: str, latency: float) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO answers (key, response, latency, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, latency, time.time()),
+            )
+            # Eliminar las entradas menos usadas recientemente por encima del límite
+            self._connection.execute(
+                "DELETE FROM answers WHERE key IN "
+                "(SELECT key FROM answers ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+            self._connection.commit()
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def build_answer_cache(backend: str, path: str, max_size: int) -> AnswerCache | None:
+    """
+    Construye la caché a partir de la configuración.
+
+    Args:
+        backend: "none", "memory" o "sqlite"
+        path: Ruta del fichero SQLite (solo para "sqlite")
+        max_size: Número máximo de entradas
+    """
+    backend = backend.lower()
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryAnswerCache(max_size)
+    if backend == "sqlite":
+        return SqliteAnswerCache(path, max_size)
+    raise ValueError(f"Backend de caché no soportado: {backend}")
@@ -1,28 +1,43 @@
 import json
 import re
+import time
 
 from openai import OpenAI
 
+from src.inference.answer_cache import AnswerCache
 from src.inference.search import SearchTool
 from src.models import RAGResponse, ChunkReference
 
 
 class AskService:
-    def __init__(self, openai_client: OpenAI,system_prompt: str, tools: list[dict], search_tool: SearchTool):
+    def __init__(self, openai_client: OpenAI,system_prompt: str, tools: list[dict], search_tool: SearchTool,
+                 model: str = "gpt-4.1-2025-04-14", answer_cache: AnswerCache | None = None):
         
         self.openai_client = openai_client
         self.system_prompt = system_prompt
         self.tools = tools
         self.search_tool = search_tool
+        self.model = model
+        self.answer_cache = answer_cache
         
-    def ask(self, query: str) -> RAGResponse:
+    def ask(self, query: str, document_names: list[str] | None = None, shards: list[str] | None = None) -> RAGResponse:
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = self.answer_cache.build_key(query, self.system_prompt, self.model, document_names, shards)
+            cached_response = self.answer_cache.get(
+                cache_key, lambda evidence: self._evidence_unchanged(evidence, document_names, shards)
+            )
+            if cached_response is not None:
+                return cached_response.model_copy(update={"query": query})
+
+        start = time.perf_counter()
         input_list = [
             {"role": "developer", "content": self.system_prompt},
             {"role": "user", "content": query}
         ]
         response = self.openai_client.responses.create(
             input=input_list,
-            model="gpt-4.1-2025-04-14",
+            model=self.model,
             tools=self.tools
         )
         input_list += response.output
@@ -31,26 +46,43 @@ class AskService:
         if not tool_calls:
             return response
         
+        evidence = {}
         for tool_call in tool_calls:
             name = tool_call.name
             args = json.loads(tool_call.arguments)
             if name == "search":
-                result, retrieved_chunks = self.search_tool(**args)
+                candidates = self.search_tool.retrieve_candidates(args["query"], document_names=document_names, shards=shards)
+                evidence[args["query"]] = [str(chunk.id) for chunk in candidates]
+                result, retrieved_chunks = self.search_tool(
+                    **args, document_names=document_names, candidates=candidates, shards=shards
+                )
                 input_list.append({"type": "function_call_output", "call_id": tool_call.call_id, "output": result})
         
         response = self.openai_client.responses.create(
             input=input_list,
-            model="gpt-4.1-2025-04-14",
+            model=self.model,
             tools=self.tools
         )
         references = self.postprocess_references(response.output_text, retrieved_chunks)
-        return RAGResponse(
+        rag_response = RAGResponse(
             query=query,
             search_query=args["query"],
             answer=response.output_text,
             retrieved_chunks=[ChunkReference(chunk_index=chunk.chunk_index, document_name=chunk.document_name) for chunk in retrieved_chunks],
             references=[ChunkReference(chunk_index=chunk.chunk_index, document_name=chunk.document_name) for chunk in references]
         )
+        if cache_key is not None:
+            self.answer_cache.set(cache_key, rag_response, evidence, time.perf_counter() - start)
+        return rag_response
+
+    def _evidence_unchanged(self, evidence: dict[str, list[str]], document_names: list[str] | None,
+                            shards: list[str] | None) -> bool:
+        """Comprueba que las búsquedas de una respuesta cacheada siguen recuperando los mismos chunks."""
+        for search_query, chunk_ids in evidence.items():
+            candidates = self.search_tool.retrieve_candidates(search_query, document_names=document_names, shards=shards)
+            if sorted(str(chunk.id) for chunk in candidates) != chunk_ids:
+                return False
+        return True
 
     def postprocess_references(self, response: str, retrieved_chunks: list[ChunkReference]) -> list[ChunkReference]:
         
@@ -1,24 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from src.shared.qdrant_repository import QdrantRepository
 from src.shared.embeddings import EmbeddingsService
+from src.shared.shard_router import ShardRouter
 from src.models import Chunk
 from src.inference.reranker import Reranker
 
 
 class SearchTool:
 
-    def __init__(self, qdrant_repository: QdrantRepository, embeddings_service: EmbeddingsService, reranker: Reranker | None = None):
+    def __init__(self, qdrant_repository: QdrantRepository, embeddings_service: EmbeddingsService, reranker: Reranker | None = None,
+                 *, shard_router: ShardRouter):
         self.qdrant_repository = qdrant_repository
         self.embeddings_service = embeddings_service
         self.reranker = reranker
+        self.shard_router = shard_router
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.shard_router.collections_for()), 1))
 
-    def search(self, query: str):
-        search_embedding = self.embeddings_service.get_embeddings(query)
+    def search(self, query: str, document_names: list[str] | None = None, candidates: list[Chunk] | None = None,
+               shards: list[str] | None = None):
+        """
+        Args:
+            candidates: Resultado previo de `retrieve_candidates` para esta misma query.
+                Si se indica, se reutiliza en lugar de volver a calcular el embedding y buscar.
+        """
+        if candidates is None:
+            candidates = self.retrieve_candidates(query, document_names=document_names, shards=shards)
         if self.reranker:
-            search_results = self.qdrant_repository.search("rag-pipeline", search_embedding, top_k=25)
-            search_results = self.reranker.rerank(query, search_results)
+            search_results = self.reranker.rerank(query, candidates)
         else:
-            search_results = self.qdrant_repository.search("rag-pipeline", search_embedding, top_k=5)
+            search_results = candidates
         return search_results
+
+    def retrieve(self, search_embedding: list[float], top_k: int, document_names: list[str] | None = None,
+                 shards: list[str] | None = None) -> list[Chunk]:
+        """
+        Busca en paralelo en todos los shards relevantes y fusiona los resultados por score.
+
+        Raises:
+            ValueError: Si no existe ninguna de las colecciones relevantes
+        """
+        collections = self.shard_router.collections_for(document_names, shards)
+        if not collections:
+            return []
+        # Un shard configurado pero todavía sin ingestar no tiene colección
+        existing = [collection for collection in collections if self.qdrant_repository.collection_exists(collection)]
+        if not existing:
+            raise ValueError(f"No existe ninguna de las colecciones: {', '.join(collections)}")
+        collections = existing
+        if len(collections) == 1:
+            return self.qdrant_repository.search(collections[0], search_embedding, top_k=top_k, document_names=document_names)
+        futures = [
+            self._executor.submit(self.qdrant_repository.search, collection, search_embedding, top_k, document_names)
+            for collection in collections
+        ]
+        search_results = [chunk for future in futures for chunk in future.result()]
+        search_results.sort(key=lambda chunk: chunk.score or 0.0, reverse=True)
+        return search_results[:top_k]
+
+    def retrieve_candidates(self, query: str, document_names: list[str] | None = None,
+                            shards: list[str] | None = None) -> list[Chunk]:
+        """
+        Devuelve los chunks candidatos de la búsqueda vectorial, antes del rerankeo.
+        Sus IDs sirven como huella de la evidencia que recibe el LLM para una query.
+        """
+        search_embedding = self.embeddings_service.get_embeddings(query)
+        top_k = 25 if self.reranker else 5
+        return self.retrieve(search_embedding, top_k=top_k, document_names=document_names, shards=shards)
         
     def format_search_results(self, search_results: list[Chunk], query: str) -> str:
         search_tool_output = "<ToolResponse>\n"
@@ -37,6 +85,7 @@ class SearchTool:
         search_tool_output += "</ToolResponse>"
         return search_tool_output
 
-    def __call__(self, query: str) -> str:
-        search_results = self.search(query)
+    def __call__(self, query: str, document_names: list[str] | None = None, candidates: list[Chunk] | None = None,
+                 shards: list[str] | None = None) -> str:
+        search_results = self.search(query, document_names, candidates, shards)
         return self.format_search_results(search_results, query), search_results
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+@dataclass
+class RequestTiming:
+    scheduled: float
+    started: float = 0.0
+    finished: float = 0.0
+    error: str | None = None
+    stages: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    @property
+    def queue_delay(self) -> float:
+        return self.started - self.scheduled
+
+    @property
+    def latency(self) -> float:
+        return self.finished - self.started
+
+
+class StageRecorder:
+    """
+    Acumula el tiempo de cada etapa (embeddings, búsqueda, rerank, LLM) en la
+    petición que se está ejecutando en el hilo actual.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def bind(self, timing: RequestTiming | None) -> None:
+        self._local.timing = timing
+
+    def record(self, stage: str, seconds: float) -> None:
+        timing = getattr(self._local, "timing", None)
+        if timing is not None:
+            timing.stages[stage] += seconds
+
+    def wrap(self, obj, method_name: str, stage: str):
+        """Sustituye `obj.method_name` por una versión que mide su duración en `stage`."""
+        method = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        setattr(obj, method_name, timed)
+        return obj
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentil por rango más cercano (q en [0, 100])."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-q * len(ordered) // 100)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class LoadGenerator:
+    """
+    Reproduce una lista de queries contra una función objetivo.
+
+    Con `qps` se lanza en bucle abierto: las peticiones se planifican a intervalos
+    fijos y el retraso en cola es el tiempo entre su planificación y el inicio de
+    su ejecución. Sin `qps`, se mantienen `concurrency` peticiones en vuelo.
+    """
+
+    def __init__(self, target: Callable[[str], object], recorder: StageRecorder, concurrency: int = 8,
+                 qps: float | None = None):
+        if concurrency <= 0:
+            raise ValueError("concurrency debe ser > 0.")
+        if qps is not None and qps <= 0:
+            raise ValueError("qps debe ser > 0.")
+        self.target = target
+        self.recorder = recorder
+        self.concurrency = concurrency
+        self.qps = qps
+
+    def _execute(self, query: str, timing: RequestTiming) -> RequestTiming:
+        timing.started = time.perf_counter()
+        self.recorder.bind(timing)
+        try:
+            self.target(query)
+        except Exception as e:
+            timing.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.recorder.bind(None)
+            timing.finished = time.perf_counter()
+        return timing
+
+    def run(self, queries: list[str]) -> dict:
+        timings: list[RequestTiming] = []
+        in_flight = threading.BoundedSemaphore(self.concurrency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = []
+            for i, query in enumerate(queries):
+                if self.qps:
+                    scheduled = start + i / self.qps
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    in_flight.acquire()
+                    scheduled = time.perf_counter()
+                timing = RequestTiming(scheduled=scheduled)
+                timings.append(timing)
+                future = executor.submit(self._execute, query, timing)
+                if not self.qps:
+                    future.add_done_callback(lambda _: in_flight.release())
+                futures.append(future)
+            for future in futures:
+                future.result()
+        return self.report(timings, time.perf_counter() - start)
+
+    @staticmethod
+    def report(timings: list[RequestTiming], elapsed: float) -> dict:
+        latencies = [timing.latency for timing in timings]
+        queue_delays = [timing.queue_delay for timing in timings]
+        stages = sorted({stage for timing in timings for stage in timing.stages})
+        summary = {
+            "requests": len(timings),
+            "errors": sum(1 for timing in timings if timing.error),
+            "elapsed_s": elapsed,
+            "throughput_rps": len(timings) / elapsed if elapsed else 0.0,
+            "latency_ms": _summarize(latencies),
+            "queue_delay_ms": _summarize(queue_delays),
+            "stages_ms": {stage: _summarize([timing.stages.get(stage, 0.0) for timing in timings]) for stage in stages},
+        }
+        return summary
+
+
+def _summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "mean": 1000 * sum(values) / len(values) if values else 0.0,
+        "p50": 1000 * percentile(values, 50),
+        "p95": 1000 * percentile(values, 95),
+        "p99": 1000 * percentile(values, 99),
+    }
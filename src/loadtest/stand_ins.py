@@ -0,0 +1,145 @@
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from types import SimpleNamespace
+
+from src.models import Chunk
+from src.shared.qdrant_repository import QdrantRepository
+
+
+def _request_rng(seed: int, *keys: str) -> random.Random:
+    # Generador derivado de la petición, para que los resultados no dependan del orden de los hilos
+    return random.Random(hashlib.sha256("\x1f".join([str(seed), *keys]).encode("utf-8")).digest())
+
+
+def _sleep_ms(latency_ms: float, jitter_ms: float, rng: random.Random) -> None:
+    delay = latency_ms + (rng.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0.0)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+
+# Palabras interrogativas o imperativas y artículos que el LLM suele quitar al reformular
+_LEADING_WORDS = re.compile(
+    r"^(?:(?:con|en|de|por|para)\s+)?(?:qué|que|cuál|cuáles|cómo|cuántos|cuántas|cuándo|dónde|quién|describe|explica)\s+"
+    r"(?:(?:el|la|los|las|se)\s+)?",
+    re.IGNORECASE,
+)
+
+
+def rewrite_query(query: str) -> str:
+    """
+    Reformula una query como suele hacerlo el LLM antes de buscar: sin signos de
+    interrogación ni la palabra interrogativa inicial.
+    Por ejemplo, "¿Cómo se realizó el finetuning de BERT?" -> "realizó el finetuning de BERT".
+    """
+    rewritten = re.sub(r"[¿?¡!]", "", query).strip()
+    rewritten = _LEADING_WORDS.sub("", rewritten)
+    return rewritten or query
+
+
+class LocalOpenAIClient:
+    """
+    Sustituto determinista del cliente de OpenAI para pruebas de carga.
+
+    Implementa únicamente `responses.create` con el flujo que usa AskService: la
+    primera llamada emite una llamada a la función `search` (con la query del
+    usuario tal cual o reformulada con `rewrite_query`) y la segunda responde
+    referenciando los chunks recuperados.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 0.0, seed: int = 0,
+                 rewrite_queries: bool = False):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+        self.rewrite_queries = rewrite_queries
+        self.responses = SimpleNamespace(create=self._create)
+
+    def _create(self, input: list, model: str, tools: list[dict]):
+        query = next(item["content"] for item in input if isinstance(item, dict) and item.get("role") == "user")
+        tool_outputs = [item for item in input if isinstance(item, dict) and item.get("type") == "function_call_output"]
+        turn = str(len(tool_outputs))
+        _sleep_ms(self.latency_ms, self.jitter_ms, _request_rng(self.seed, "llm", turn, query))
+        if not tool_outputs:
+            call_id = hashlib.sha256(f"{self.seed}\x1f{query}".encode("utf-8")).hexdigest()[:12]
+            function_call = SimpleNamespace(
+                type="function_call",
+                name="search",
+                arguments=json.dumps(
+                    {"query": rewrite_query(query) if self.rewrite_queries else query}, ensure_ascii=False
+                ),
+                call_id=f"call_{call_id}",
+            )
+            return SimpleNamespace(output=[function_call], output_text="")
+
+        references = re.findall(r"document_name=(\S+) chunk_index=(\d+)>", tool_outputs[-1]["output"])
+        answer = "Respuesta simulada " + "".join(f"[{name}::{index}]" for name, index in references[:2])
+        message = SimpleNamespace(type="message", content=answer)
+        return SimpleNamespace(output=[message], output_text=answer)
+
+
+class LocalEmbeddingsService:
+    """
+    Sustituto de EmbeddingsService que genera vectores normalizados a partir de
+    un hash del texto, con una latencia configurable.
+    """
+
+    def __init__(self, dimension: int = 1024, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+
+    def get_embeddings(self, text: str) -> list[float]:
+        _sleep_ms(self.latency_ms, self.jitter_ms, _request_rng(self.seed, "embeddings", text))
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimension)]
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector]
+
+
+class LocalReranker:
+    """Sustituto de Reranker que conserva el orden de entrada tras una latencia configurable."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+
+    def rerank(self, query, chunks: list[Chunk], top_k: int = 5) -> list[Chunk]:
+        _sleep_ms(self.latency_ms, self.jitter_ms, _request_rng(self.seed, "rerank", query))
+        return chunks[:top_k]
+
+
+class InMemoryQdrantRepository(QdrantRepository):
+    """QdrantRepository sobre el modo en memoria de qdrant-client, sin servidor."""
+
+    def __init__(self):
+        super().__init__(location=":memory:")
+
+    def seed(self, collection_name: str, embeddings_service: LocalEmbeddingsService,
+             document_names: list[str], chunks_per_document: int = 50) -> int:
+        """
+        Puebla la colección con chunks sintéticos.
+
+        Returns:
+            Número de chunks ingestados
+        """
+        for document_name in document_names:
+            for chunk_index in range(chunks_per_document):
+                text = f"{document_name} chunk {chunk_index}"
+                self.upsert(collection_name, Chunk(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, text)),
+                    document_name=document_name,
+                    text=text,
+                    chunk_index=chunk_index,
+                    start_page=1,
+                    end_page=1,
+                    pages_content={1: text},
+                    embedding=embeddings_service.get_embeddings(text),
+                ))
+        return len(document_names) * chunks_per_document
@@ -9,6 +9,7 @@ class Chunk(BaseModel):
     end_page: int
     pages_content: dict[int, str]
     embedding: list[float] | None = None
+    score: float | None = None
 
 class ChunkReference(BaseModel):
     document_name: str
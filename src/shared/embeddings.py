@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import torch
 import torch.nn.functional as F
 from torch import Tensor
@@ -5,9 +7,10 @@ from torch import Tensor
 
 class EmbeddingsService:
 
-    def __init__(self, model, tokenizer):
+    def __init__(self, model, tokenizer, max_length: int | None = None):
         self.model = model
         self.tokenizer = tokenizer
+        self.max_length = max_length
 
     def last_token_pool(self, last_hidden_states: Tensor, attention_mask: Tensor) -> Tensor:
         left_padding = (attention_mask[:, -1].sum() == attention_mask.shape[0])
@@ -18,10 +21,190 @@ class EmbeddingsService:
             batch_size = last_hidden_states.shape[0]
             return last_hidden_states[torch.arange(batch_size, device=last_hidden_states.device), sequence_lengths]
 
-    def get_embeddings(self, text: str) -> list[float]:
-        tokens = self.tokenizer(text, return_tensors="pt")
+    def tokenize(self, text: str, return_tensors: str = "pt"):
+        if self.max_length is None:
+            return self.tokenizer(text, return_tensors=return_tensors)
+        return self.tokenizer(text, return_tensors=return_tensors, truncation=True, max_length=self.max_length)
+
+    def forward(self, text: str) -> tuple[Tensor, Tensor]:
+        """Devuelve el último estado oculto y la máscara de atención del texto."""
+        tokens = self.tokenize(text)
         output = self.model(**tokens)
-        embeddings = self.last_token_pool(output.last_hidden_state, tokens["attention_mask"])
-        embeddings = F.normalize(embeddings, p=2, dim=1)
+        return output.last_hidden_state, tokens["attention_mask"]
+
+    def get_embeddings(self, text: str) -> list[float]:
+        with torch.inference_mode():
+            last_hidden_state, attention_mask = self.forward(text)
+            embeddings = self.last_token_pool(last_hidden_state, attention_mask)
+            embeddings = F.normalize(embeddings.float(), p=2, dim=1)
         return embeddings[0].tolist()
-    
\ No newline at end of file
+
+
+class QuantizedEmbeddingsService(EmbeddingsService):
+    """Cuantización dinámica int8 de las capas lineales para inferencia en CPU."""
+
+    def __init__(self, model, tokenizer, max_length: int | None = None):
+        model = torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(model, tokenizer, max_length)
+
+
+class _LastHiddenState(torch.nn.Module):
+    # Envoltorio para exportar a ONNX únicamente el último estado oculto, sin caché
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids: Tensor, attention_mask: Tensor) -> Tensor:
+        # Máscara causal 4D construida aquí: la de transformers usa torch.vmap, que el exportador no soporta
+        sequence_length = input_ids.shape[1]
+        causal = torch.ones(sequence_length, sequence_length, dtype=torch.bool, device=input_ids.device).tril()
+        allowed = causal[None, None, :, :] & attention_mask[:, None, None, :].bool()
+        dtype = self.model.dtype
+        mask = torch.zeros(allowed.shape, dtype=dtype, device=input_ids.device).masked_fill(~allowed, torch.finfo(dtype).min)
+        return self.model(input_ids=input_ids, attention_mask=mask, use_cache=False).last_hidden_state
+
+
+class OnnxEmbeddingsService(EmbeddingsService):
+    """
+    Inferencia con ONNX Runtime en CPU.
+
+    El modelo se exporta a `<onnx_dir>/<model_name>/model.onnx` si no existe (y, si se
+    pide, se cuantiza a int8 en `model-int8.onnx`) antes de crear la sesión. Cada
+    modelo tiene su propio directorio porque los pesos de más de 2 GB se guardan como
+    ficheros de datos externos junto al `.onnx`. El modelo de PyTorch solo se usa
+    para la exportación y no se conserva. Requiere `onnxruntime` y `onnx`.
+    """
+
+    def __init__(self, model, tokenizer, model_name: str, onnx_dir: str, max_length: int | None = None,
+                 num_threads: int | None = None, quantize: bool = False):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("El backend ONNX requiere instalar onnxruntime y onnx: poetry install --with onnx") from e
+
+        super().__init__(None, tokenizer, max_length)
+        model_dir = Path(onnx_dir) / model_name.replace("/", "--")
+        base_file = model_dir / "model.onnx"
+        onnx_file = model_dir / "model-int8.onnx" if quantize else base_file
+        exported = False
+        if not base_file.exists():
+            self.export(model, base_file)
+            exported = True
+        # Si el modelo base se acaba de exportar o es más reciente, la versión cuantizada ya no es válida
+        stale = exported or not onnx_file.exists() or onnx_file.stat().st_mtime < base_file.stat().st_mtime
+        if quantize and stale:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(str(base_file), str(onnx_file), weight_type=QuantType.QInt8)
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            session_options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(onnx_file), session_options, providers=["CPUExecutionProvider"]
+        )
+
+    def export(self, model, onnx_file: Path) -> None:
+        onnx_file.parent.mkdir(parents=True, exist_ok=True)
+        tokens = self.tokenizer("Exportación del modelo de embeddings", return_tensors="pt")
+        print(f"Exportando modelo de embeddings a ONNX: {onnx_file}")
+        with torch.no_grad():
+            torch.onnx.export(
+                _LastHiddenState(model.eval()),
+                (tokens["input_ids"], tokens["attention_mask"]),
+                str(onnx_file),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=17,
+            )
+
+    def forward(self, text: str) -> tuple[Tensor, Tensor]:
+        tokens = self.tokenize(text, return_tensors="np")
+        last_hidden_state = self.session.run(
+            ["last_hidden_state"],
+            {"input_ids": tokens["input_ids"].astype("int64"), "attention_mask": tokens["attention_mask"].astype("int64")},
+        )[0]
+        return torch.from_numpy(last_hidden_state), torch.from_numpy(tokens["attention_mask"])
+
+
+def check_parity(reference: EmbeddingsService, candidate: EmbeddingsService, texts: list[str],
+                 tolerance: float = 0.02) -> float:
+    """
+    Comprueba que los vectores normalizados de un backend se mantienen cerca de los
+    del modelo de referencia, para que las colecciones existentes sigan siendo compatibles.
+
+    Args:
+        reference: Servicio de embeddings con el modelo original
+        candidate: Servicio de embeddings a validar
+        texts: Textos sobre los que comparar
+        tolerance: Distancia coseno máxima permitida (1 - similitud)
+
+    Returns:
+        Similitud coseno mínima observada
+
+    Raises:
+        ValueError: Si algún texto supera la tolerancia
+    """
+    if not texts:
+        raise ValueError("Se necesita al menos un texto para comprobar la paridad.")
+    min_similarity = 1.0
+    for text in texts:
+        similarity = sum(a * b for a, b in zip(reference.get_embeddings(text), candidate.get_embeddings(text)))
+        min_similarity = min(min_similarity, similarity)
+    if 1 - min_similarity > tolerance:
+        raise ValueError(
+            f"El backend de embeddings no supera la comprobación de paridad: "
+            f"similitud coseno mínima {min_similarity:.4f} < {1 - tolerance:.4f}"
+        )
+    return min_similarity
+
+
+def build_embeddings_service(backend: str, model, tokenizer, model_name: str, max_length: int | None = None,
+                             num_threads: int | None = None, onnx_dir: str = ".cache/onnx",
+                             parity_texts: list[str] | None = None, parity_tolerance: float = 0.02) -> EmbeddingsService:
+    """
+    Construye el servicio de embeddings para el backend indicado.
+
+    Salvo para el backend "torch" sin truncado, la paridad se comprueba contra el
+    modelo de referencia sin truncar, que es con el que se generaron los vectores ingestados.
+
+    Args:
+        backend: "torch", "int8", "onnx" u "onnx-int8"
+        model: Modelo de embeddings de referencia
+        tokenizer: Tokenizer del modelo
+        model_name: Nombre del modelo, usado para nombrar la exportación ONNX
+        max_length: Longitud máxima de secuencia (None para no truncar)
+        num_threads: Hilos intra-op. En los backends ONNX solo afectan a la sesión de
+            embeddings; en "torch" e "int8" se fijan con `torch.set_num_threads`, que es
+            global al proceso y limita también al reranker.
+        onnx_dir: Directorio de los modelos exportados a ONNX
+        parity_texts: Textos para comprobar la paridad con el modelo de referencia
+        parity_tolerance: Distancia coseno máxima permitida
+    """
+    backend = backend.lower()
+    if backend in ("torch", "int8") and num_threads is not None:
+        torch.set_num_threads(num_threads)
+
+    if backend == "torch":
+        candidate = EmbeddingsService(model, tokenizer, max_length)
+        if max_length is None:
+            return candidate
+    elif backend == "int8":
+        candidate = QuantizedEmbeddingsService(model, tokenizer, max_length)
+    elif backend in ("onnx", "onnx-int8"):
+        candidate = OnnxEmbeddingsService(
+            model, tokenizer, model_name, onnx_dir, max_length, num_threads, quantize=backend == "onnx-int8"
+        )
+    else:
+        raise ValueError(f"Backend de embeddings no soportado: {backend}")
+
+    if parity_texts:
+        reference = EmbeddingsService(model, tokenizer)
+        min_similarity = check_parity(reference, candidate, parity_texts, parity_tolerance)
+        print(f"Paridad del backend {backend}: similitud coseno mínima {min_similarity:.4f}")
+    return candidate
@@ -8,14 +8,28 @@ class Environment(BaseSettings):
 
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_COLLECTION: str = "rag-pipeline"
+    # Shards del corpus: {nombre_shard: [document_name, ...]}. Vacío = una única colección
+    QDRANT_SHARDS: dict[str, list[str]] = {}
 
     EMBEDDINGS_MODEL: str = "Qwen/Qwen3-Embedding-0.6B"
     EMBEDDINGS_TOKENIZER: str = "Qwen/Qwen3-Embedding-0.6B"
+    # Backend para las queries: torch, int8, onnx u onnx-int8
+    EMBEDDINGS_BACKEND: str = "torch"
+    EMBEDDINGS_THREADS: int | None = None
+    EMBEDDINGS_MAX_LENGTH: int | None = None
+    EMBEDDINGS_ONNX_DIR: str = ".cache/onnx"
+    EMBEDDINGS_PARITY_TOLERANCE: float = 0.02
 
     RERANKER_MODEL: str = "Alibaba-NLP/gte-multilingual-reranker-base"
 
     RERANK: bool = True
 
+    OPENAI_MODEL: str = "gpt-4.1-2025-04-14"
+
+    ANSWER_CACHE: str = "none"
+    ANSWER_CACHE_PATH: str = ".cache/answers.sqlite"
+    ANSWER_CACHE_SIZE: int = 1024
+
     PDFS_URLS: list[str] = [
         "https://arxiv.org/pdf/1706.03762",
         "https://arxiv.org/pdf/1810.04805",
@@ -1,13 +1,51 @@
+import time
+
 from qdrant_client import QdrantClient, models
 from src.models import Chunk
 
 class QdrantRepository:
-    def __init__(self, url: str):
-        self.client = QdrantClient(url=url)
+    # Segundos durante los que se recuerda que una colección no existe
+    MISSING_COLLECTION_TTL = 30.0
+
+    def __init__(self, url: str | None = None, location: str | None = None):
+        self.client = QdrantClient(url=url, location=location)
+        self._existing_collections: set[str] = set()
+        self._missing_collections: dict[str, float] = {}
+        self._indexed_collections: set[str] = set()
+
+    def collection_exists(self, collection_name: str) -> bool:
+        """
+        Comprueba si existe una colección. Las colecciones existentes se recuerdan
+        indefinidamente y las inexistentes durante MISSING_COLLECTION_TTL segundos.
+        """
+        if collection_name in self._existing_collections:
+            return True
+        checked_at = self._missing_collections.get(collection_name)
+        if checked_at is not None and time.monotonic() - checked_at < self.MISSING_COLLECTION_TTL:
+            return False
+        if self.client.collection_exists(collection_name):
+            self._existing_collections.add(collection_name)
+            self._missing_collections.pop(collection_name, None)
+            return True
+        self._missing_collections[collection_name] = time.monotonic()
+        return False
+
+    def ensure_document_index(self, collection_name: str) -> None:
+        """
+        Crea (una vez por proceso) el índice de payload sobre `document` usado por los filtros.
+        Solo se invoca desde la ingesta y la migración, nunca desde la búsqueda.
+        """
+        if collection_name in self._indexed_collections:
+            return
+        self.client.create_payload_index(collection_name, "document", field_schema=models.PayloadSchemaType.KEYWORD)
+        self._indexed_collections.add(collection_name)
 
     def upsert(self, collection_name: str, chunk: Chunk):
-        if not self.client.collection_exists(collection_name):
+        if not self.collection_exists(collection_name):
             self.client.create_collection(collection_name, vectors_config=models.VectorParams(size=1024, distance=models.Distance.COSINE))
+            self._existing_collections.add(collection_name)
+            self._missing_collections.pop(collection_name, None)
+        self.ensure_document_index(collection_name)
         
         self.client.upsert(
             collection_name, 
@@ -25,10 +63,17 @@ class QdrantRepository:
             ]
         )
 
-    def search(self, collection_name: str, search_embedding: list[float], top_k: int = 5) -> list[Chunk]:
+    def search(self, collection_name: str, search_embedding: list[float], top_k: int = 5,
+               document_names: list[str] | None = None) -> list[Chunk]:
+        query_filter = None
+        if document_names is not None:
+            query_filter = models.Filter(
+                must=[models.FieldCondition(key="document", match=models.MatchAny(any=document_names))]
+            )
         search_results = self.client.query_points(
             collection_name, 
             search_embedding, 
+            query_filter=query_filter,
             limit=top_k)
         chunks = []
         for result in search_results.points:
@@ -40,5 +85,6 @@ class QdrantRepository:
                 start_page=result.payload["start_page"],
                 end_page=result.payload["end_page"],
                 pages_content=result.payload["pages_content"],
+                score=result.score,
             ))
         return chunks
\ No newline at end of file
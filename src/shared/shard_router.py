@@ -0,0 +1,58 @@
+from src.models import Chunk
+
+
+class ShardRouter:
+    """
+    Reparte el corpus entre varias colecciones de Qdrant.
+
+    Cada shard agrupa un conjunto de documentos (por grupo documental, tenant o
+    rango temporal) y se almacena en la colección `<base>-<shard>`. Los documentos
+    que no pertenecen a ningún shard van a la colección base. Sin shards
+    configurados, todo el corpus vive en la colección base.
+    """
+
+    def __init__(self, base_collection: str, shards: dict[str, list[str]] | None = None):
+        self.base_collection = base_collection
+        self.shards = shards or {}
+        self._document_to_collection: dict[str, str] = {}
+        for shard, document_names in self.shards.items():
+            for document_name in document_names:
+                if document_name in self._document_to_collection:
+                    raise ValueError(f"El documento {document_name} está asignado a más de un shard.")
+                self._document_to_collection[document_name] = self.shard_collection(shard)
+
+    def shard_collection(self, shard: str) -> str:
+        return f"{self.base_collection}-{shard}"
+
+    def collection_for(self, chunk: Chunk) -> str:
+        """Devuelve la colección en la que debe ingestarse un chunk."""
+        return self._document_to_collection.get(chunk.document_name, self.base_collection)
+
+    def collections_for(self, document_names: list[str] | None = None, shards: list[str] | None = None) -> list[str]:
+        """
+        Devuelve las colecciones en las que hay que buscar.
+
+        Args:
+            document_names: Documentos a los que restringir la búsqueda. Si es None,
+                se busca en todas las colecciones permitidas.
+            shards: Shards a los que restringir la búsqueda (p. ej. los del tenant que
+                consulta). Si es None, se permiten la colección base y todos los shards.
+
+        Raises:
+            ValueError: Si algún shard no está configurado
+        """
+        if shards is None:
+            allowed = [self.base_collection] + [self.shard_collection(shard) for shard in self.shards]
+        else:
+            unknown = [shard for shard in shards if shard not in self.shards]
+            if unknown:
+                raise ValueError(f"Shards no configurados: {', '.join(unknown)}")
+            allowed = [self.shard_collection(shard) for shard in shards]
+        if document_names is None:
+            return allowed
+        collections = []
+        for document_name in document_names:
+            collection = self._document_to_collection.get(document_name, self.base_collection)
+            if collection in allowed and collection not in collections:
+                collections.append(collection)
+        return collections